@@ -0,0 +1,80 @@
+"""
+Contract status transitions from parallel workers without global locks.
+
+Each worker has its own Model/session on one file database and toggles
+random contracts between ACTIVE and CLOSED. Fewer contracts -> more contention.
+
+    python ./benchmarks/bench_contention.py [WORKERS] [OPERATIONS] [CONTRACTS]
+"""
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import exceptions as exc
+from dbconnection import DBConnection
+from model import Model, RetryPolicy, Contract
+
+
+def worker(db: str, retry_policy, contract_ids, operations: int, conflicts: list):
+    model = Model(DBConnection(db), retry_policy)
+    failed = 0
+    for _ in range(operations):
+        contract_id = random.choice(contract_ids)
+        try:
+            if random.random() < 0.5:
+                model.confirm_contract(contract_id, date_signed=date.today())
+            else:
+                model.close_contract(contract_id)
+        except exc.VersionConflict:
+            failed += 1
+    model.dbc.disconnect()
+    conflicts.append(failed)
+
+
+def run(db_path: Path, retry_policy, workers: int, operations: int, contracts: int):
+    db_path.unlink(missing_ok=True)
+    db = f'sqlite:///{db_path}'
+    model = Model(DBConnection(db))
+    for i in range(contracts):
+        model.create_contract(Contract(f'Договор {i}', date.today()))
+    contract_ids = [c.id for c in model.read_contracts()]
+    model.dbc.disconnect()
+
+    conflicts = []
+    threads = [threading.Thread(target=worker, args=(db, retry_policy, contract_ids, operations, conflicts))
+               for _ in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total = workers * operations
+    return elapsed, total, sum(conflicts)
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    operations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    contracts = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    tmp_dir = Path(tempfile.mkdtemp())
+    try:
+        print(f'{workers} workers x {operations} operations on {contracts} contracts')
+        for name, retry_policy in (('no retry', None), ('retry', RetryPolicy())):
+            elapsed, total, failed = run(tmp_dir / 'data.db', retry_policy, workers, operations, contracts)
+            print(f'{name:10} {elapsed:8.3f} s  {total / elapsed:8.0f} ops/s  conflicts: {failed}/{total}')
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
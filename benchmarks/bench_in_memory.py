@@ -0,0 +1,48 @@
+"""
+File-backed vs in-memory DBConnection: N contract inserts, one commit each.
+
+    python ./benchmarks/bench_in_memory.py [N]
+"""
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from dbconnection import DBConnection, InMemoryDBConnection
+from model import Model, Contract
+
+
+def run(dbc, n: int) -> float:
+    model = Model(dbc)
+    start = time.perf_counter()
+    for i in range(n):
+        model.create_contract(Contract(f'Договор {i}', date.today()))
+    elapsed = time.perf_counter() - start
+    dbc.disconnect()
+    return elapsed
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    tmp_dir = Path(tempfile.mkdtemp())
+    try:
+        file_db = tmp_dir / 'file.db'
+        memory_db = tmp_dir / 'memory.db'
+
+        file_time = run(DBConnection(f'sqlite:///{file_db}'), n)
+        memory_time = run(InMemoryDBConnection(str(memory_db)), n)
+
+        print(f'{n} commits')
+        print(f'file-backed: {file_time:8.3f} s  {n / file_time:10.0f} ops/s')
+        print(f'in-memory:   {memory_time:8.3f} s  {n / memory_time:10.0f} ops/s')
+        print(f'speedup:     {file_time / memory_time:8.1f}x')
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,10 @@
 # DATABASE
-SQLITE_DB = "sqlite:///./data/data.db"
+SQLITE_DB_PATH = "./data/data.db"
+SQLITE_DB = f"sqlite:///{SQLITE_DB_PATH}"
+SQLITE_MEMORY_DB = "sqlite://"
 DEFAULT_DB = SQLITE_DB
 
-
+# in-memory mode: engine works on an in-memory copy of SQLITE_DB_PATH,
+# snapshots are written back every SNAPSHOT_INTERVAL seconds
+IN_MEMORY_DB = False
+SNAPSHOT_INTERVAL = 5.0
@@ -90,7 +90,8 @@ class Controller:
             self.model.add_contract_to_project(project_id, contract_id)
             self.view.show_message(f'Договор №{contract_id} добавлен в проект №{project_id}')
 
-        except (exc.ContractIsNotActive, exc.ContractDuplicationInProject, exc.ActiveContractAlreadyExistsInProject) as e:
+        except (exc.ContractIsNotActive, exc.ContractDuplicationInProject, exc.ActiveContractAlreadyExistsInProject,
+                exc.ContractNotFound, exc.ProjectNotFound, exc.VersionConflict) as e:
             self.view.show_message(e)
 
     def show_projects(self):
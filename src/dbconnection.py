@@ -1,15 +1,32 @@
-from sqlalchemy import Engine, create_engine, select, update, delete
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict
+
+from sqlalchemy import Engine, Executable, bindparam, create_engine, select, update, delete
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 
-from constants import DEFAULT_DB
+import exceptions as exc
+from constants import DEFAULT_DB, SQLITE_MEMORY_DB, SQLITE_DB_PATH, SNAPSHOT_INTERVAL
 
 
 class DBQuery:
     session: Session
 
+    # prebuilt parameterized statements shared by all queries: built and compiled once per key
+    statements: Dict[tuple, Executable] = {}
+
     def __init__(self, session: Session):
         self.session = session
 
+    @classmethod
+    def statement(cls, key: tuple, build: Callable[[], Executable]) -> Executable:
+        stmt = cls.statements.get(key)
+        if stmt is None:
+            stmt = cls.statements[key] = build()
+        return stmt
+
     # CREATE
     def create_item(self, item):
         self.session.add(item)
@@ -24,9 +41,11 @@ class DBQuery:
     def read_items(self, entity, filter=None):
 
         if filter is None:
-            stmt = (select(entity)
-                    .order_by(entity.id)
-                    )
+            stmt = self.statement(('read_items', entity),
+                                  lambda: (select(entity)
+                                           .order_by(entity.id)
+                                           )
+                                  )
         else:
             stmt = (select(entity)
                     .where(filter)
@@ -35,20 +54,57 @@ class DBQuery:
 
         return self.session.scalars(stmt).all()
 
+    def read_items_cached(self, key: tuple, build: Callable[[], Executable], **params):
+        return self.session.scalars(self.statement(key, build), params).all()
+
     # UPDATE
     def update_item(self, entity, id: int, **values):
-        stmt = (update(entity)
-                .where(entity.id == id)
-                .values(**values)
-                )
-        self.session.execute(stmt)
+        # column names are reserved for the SET clause, so bound parameters get a prefix
+        def build():
+            set_values = {name: bindparam(f'v_{name}') for name in values}
+            # plain writes still bump the version so concurrent swap_item() calls see the change
+            if hasattr(entity, 'version') and 'version' not in values:
+                set_values['version'] = entity.version + 1
+
+            return (update(entity)
+                    .where(entity.id == bindparam('b_id'))
+                    .values(set_values)
+                    .execution_options(synchronize_session=False)
+                    )
+
+        stmt = self.statement(('update_item', entity, tuple(sorted(values))), build)
+        self.session.execute(stmt, {'b_id': id, **{f'v_{name}': value for name, value in values.items()}})
         self.commit()
         # TODO: add return
 
+    def swap_item(self, entity, id: int, version: int, **values) -> bool:
+        """
+        Compare-and-swap update: applies `values` and bumps the version only if the row
+        still has `version`. Does not commit. Returns False if the row was changed meanwhile.
+        """
+        def build():
+            return (update(entity)
+                    .where(entity.id == bindparam('b_id'), entity.version == bindparam('b_version'))
+                    .values(version=entity.version + 1, **{name: bindparam(f'v_{name}') for name in values})
+                    .execution_options(synchronize_session=False)
+                    )
+
+        stmt = self.statement(('swap_item', entity, tuple(sorted(values))), build)
+        result = self.session.execute(stmt, {'b_id': id,
+                                             'b_version': version,
+                                             **{f'v_{name}': value for name, value in values.items()},
+                                             })
+        return result.rowcount == 1
+
     # DELETE
     def delete_item(self, entity, id: int):
-        stmt = delete(entity).where(entity.id == id)
-        self.session.execute(stmt)
+        stmt = self.statement(('delete_item', entity),
+                              lambda: (delete(entity)
+                                       .where(entity.id == bindparam('b_id'))
+                                       .execution_options(synchronize_session=False)
+                                       )
+                              )
+        self.session.execute(stmt, {'b_id': id})
         self.commit()
 
     def delete_all(self, entity):
@@ -66,8 +122,8 @@ class DBConnection:
     engine: Engine
     session: Session
 
-    def __init__(self, db_engine=DEFAULT_DB):
-        self.engine = create_engine(db_engine)
+    def __init__(self, db_engine=DEFAULT_DB, **engine_options):
+        self.engine = create_engine(db_engine, **engine_options)
 
     def __enter__(self):
         self.connect()
@@ -86,3 +142,101 @@ class DBConnection:
 
     def disconnect(self):
         self.session.close()
+
+
+class InMemoryDBConnection(DBConnection):
+    """
+    Connection to an in-memory SQLite database loaded from `snapshot_path` at startup.
+
+    Commits never touch the disk. The database is written back to `snapshot_path`
+    with the SQLite online backup API every `snapshot_interval` seconds, on demand
+    via `snapshot()` and on `disconnect()`. Data committed after the last snapshot
+    is lost on crash. Snapshots are refused while a write transaction is open.
+    """
+    snapshot_path: str
+    snapshot_interval: float
+
+    def __init__(self, snapshot_path=SQLITE_DB_PATH, snapshot_interval=SNAPSHOT_INTERVAL):
+        # single shared connection: every checkout sees the same in-memory database
+        super().__init__(SQLITE_MEMORY_DB,
+                         poolclass=StaticPool,
+                         connect_args={'check_same_thread': False},
+                         )
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+
+        self._raw_connection = self.engine.raw_connection().driver_connection
+        self._snapshot_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._snapshot_thread = None
+        self._closed = False
+
+        self.load()
+
+    def connect(self):
+        super().connect()
+        self._closed = False
+        self.start_snapshots()
+
+    def disconnect(self):
+        # also called from __del__: a second final snapshot would overwrite later changes on disk
+        if self._closed:
+            return
+        self._closed = True
+
+        self.stop_snapshots()
+        super().disconnect()
+        self.snapshot()
+
+    # snapshots
+    def load(self):
+        if not os.path.exists(self.snapshot_path):
+            return
+
+        source = sqlite3.connect(self.snapshot_path)
+        try:
+            source.backup(self._raw_connection)
+        finally:
+            source.close()
+
+    def snapshot(self):
+        with self._snapshot_lock:
+            if self._raw_connection.in_transaction:
+                raise exc.SnapshotInTransaction('Открыта транзакция записи. Снимок базы отменен.')
+
+            target = sqlite3.connect(self.snapshot_path)
+            try:
+                self._raw_connection.backup(target, progress=self._check_backup_progress)
+            finally:
+                target.close()
+
+    @staticmethod
+    def _check_backup_progress(status, remaining, total):
+        # a write transaction opened after the check locks the source: abort instead of
+        # retrying forever, the aborted backup leaves the target file unchanged
+        if status in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED):
+            raise exc.SnapshotInTransaction('Открыта транзакция записи. Снимок базы отменен.')
+
+    def start_snapshots(self):
+        if not self.snapshot_interval or self._snapshot_thread is not None:
+            return
+
+        self._stop_event.clear()
+        self._snapshot_thread = threading.Thread(target=self._snapshot_loop, daemon=True)
+        self._snapshot_thread.start()
+
+    def stop_snapshots(self):
+        if self._snapshot_thread is None:
+            return
+
+        self._stop_event.set()
+        self._snapshot_thread.join()
+        self._snapshot_thread = None
+
+    def _snapshot_loop(self):
+        while not self._stop_event.wait(self.snapshot_interval):
+            try:
+                self.snapshot()
+            except exc.SnapshotInTransaction:
+                # do not copy uncommitted changes, try again on the next tick
+                continue
@@ -15,6 +15,22 @@ class ActiveContractAlreadyExistsInProject(Exception):
     pass
 
 
+class ContractNotFound(Exception):
+    pass
+
+
+class ProjectNotFound(Exception):
+    pass
+
+
+class VersionConflict(Exception):
+    pass
+
+
+class SnapshotInTransaction(Exception):
+    pass
+
+
 
 
 
@@ -1,3 +1,5 @@
+from constants import IN_MEMORY_DB
+from dbconnection import DBConnection, InMemoryDBConnection
 from model import Model
 from view import View
 from controller import Controller
@@ -5,10 +7,14 @@ from controller import Controller
 
 class Client:
     def __init__(self):
-        self.controller = Controller(Model(), View())
+        dbc = InMemoryDBConnection() if IN_MEMORY_DB else DBConnection()
+        self.controller = Controller(Model(dbc), View())
 
     def launch(self):
-        self.controller.run_app()
+        try:
+            self.controller.run_app()
+        finally:
+            self.controller.model.dbc.disconnect()
 
 
 if __name__ == '__main__':
@@ -1,9 +1,10 @@
+import random
+import time
 from enum import IntEnum
 from datetime import date
-from operator import and_
-from typing import List, Tuple
+from typing import List, Tuple, Optional
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, select, update, delete, insert
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, select, update, delete, insert, inspect, text, bindparam
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.functions import now
@@ -21,6 +22,7 @@ class Project(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     date_created = Column(DateTime, default=now)
+    version = Column(Integer, nullable=False, default=1, server_default='1')
     contracts = relationship("Contract", backref="projects")
 
     def __init__(self, name: str, date_created: date):
@@ -47,6 +49,7 @@ class Contract(Base):
     date_signed = Column(DateTime)
     status = Column(Integer, default=ContractStatus.DRAFT)
     project_id = Column(Integer, ForeignKey("projects.id"), index=True)
+    version = Column(Integer, nullable=False, default=1, server_default='1')
 
     def __init__(self, name: str, date_created: date):
         super().__init__()
@@ -61,13 +64,71 @@ class Contract(Base):
         return self.date_signed is None
 
 
+def add_missing_columns(engine):
+    # create_all() does not alter existing tables: add columns introduced later (e.g. version)
+    inspector = inspect(engine)
+    # the column spec (type, DEFAULT, NOT NULL) is rendered by the dialect, as in CREATE TABLE
+    compiler = engine.dialect.ddl_compiler(engine.dialect, None)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                connection.execute(text(f'ALTER TABLE {compiler.preparer.format_table(table)} '
+                                        f'ADD COLUMN {compiler.get_column_specification(column)}'))
+
+
+class RetryPolicy:
+    """Retry policy for operations that fail with VersionConflict."""
+    attempts: int
+    delay: float
+    backoff: float
+
+    def __init__(self, attempts: int = 5, delay: float = 0.001, backoff: float = 2.0):
+        if attempts < 1:
+            raise ValueError(f'attempts must be >= 1, got {attempts}')
+        self.attempts = attempts
+        self.delay = delay
+        self.backoff = backoff
+
+    def wait(self, attempt: int):
+        # exponential backoff with full jitter
+        time.sleep(random.uniform(0, self.delay * self.backoff ** attempt))
+
+
 class Model:
     dbc: DBConnection
+    retry_policy: Optional[RetryPolicy]
 
-    def __init__(self):
-        self.dbc = DBConnection()
+    def __init__(self, dbc: Optional[DBConnection] = None, retry_policy: Optional[RetryPolicy] = None):
+        self.dbc = dbc if dbc is not None else DBConnection()
+        self.retry_policy = retry_policy
         self.dbc.connect()
         Base.metadata.create_all(bind=self.dbc.engine)
+        add_missing_columns(self.dbc.engine)
+
+    def _retry(self, operation, *args, **kwargs):
+        attempts = self.retry_policy.attempts if self.retry_policy else 1
+        for attempt in range(attempts):
+            try:
+                return operation(*args, **kwargs)
+            except exc.VersionConflict:
+                if attempt == attempts - 1:
+                    raise
+                self.retry_policy.wait(attempt)
+
+    def _swap(self, *items):
+        """
+        Applies compare-and-swap updates (entity, id, version, values) in one transaction.
+        On conflict rolls back, so the next read sees fresh rows, and raises VersionConflict.
+        """
+        query = DBQuery(self.dbc.session)
+        for entity, id, version, values in items:
+            if not query.swap_item(entity, id, version, **values):
+                self.dbc.session.rollback()
+                raise exc.VersionConflict(f'Запись №{id} ({entity.__tablename__}) изменена параллельно. Операция отменена.')
+        query.commit()
 
     # contract operations
     def create_contract(self, contract: Contract):
@@ -89,16 +150,30 @@ class Model:
         DBQuery(self.dbc.session).delete_item(contract)
 
     def get_active_contracts(self, project_id=None):
-        return self.read_contracts(filter=and_(Contract.project_id == project_id,
-                                               Contract.status == ContractStatus.ACTIVE
-                                               )
-                                   )
+        # `project_id = NULL` never matches, free contracts need their own IS NULL statement
+        free = project_id is None
+
+        def build():
+            project_filter = Contract.project_id.is_(None) if free else Contract.project_id == bindparam('project_id')
+            return (select(Contract)
+                    .where(project_filter, Contract.status == bindparam('status'))
+                    .order_by(Contract.id)
+                    )
+
+        params = {'status': ContractStatus.ACTIVE} if free else {'status': ContractStatus.ACTIVE, 'project_id': project_id}
+        return DBQuery(self.dbc.session).read_items_cached(('active_contracts', free), build, **params)
 
     def confirm_contract(self, id: int, date_signed):
-        self.update_contract(id, status=ContractStatus.ACTIVE, date_signed=date_signed)
+        self._retry(self._set_contract_status, id, status=ContractStatus.ACTIVE, date_signed=date_signed)
 
     def close_contract(self, id: int):
-        self.update_contract(id, status=ContractStatus.CLOSED)
+        self._retry(self._set_contract_status, id, status=ContractStatus.CLOSED)
+
+    def _set_contract_status(self, id: int, **values):
+        contract = self.read_contract_by_id(id)
+        if contract is None:
+            raise exc.ContractNotFound(f'Договор №{id} не найден. Операция отменена.')
+        self._swap((Contract, id, contract.version, values))
 
     # project operations
     def create_project(self, project: Project):
@@ -124,8 +199,16 @@ class Model:
         self.create_project(project)
 
     def add_contract_to_project(self, project_id: int, contract_id: int):
+        self._retry(self._add_contract_to_project, project_id, contract_id)
+
+    def _add_contract_to_project(self, project_id: int, contract_id: int):
         project = self.read_project_by_id(project_id)
+        if project is None:
+            raise exc.ProjectNotFound(f'Проект №{project_id} не найден. Добавление отменено.')
+
         contract = self.read_contract_by_id(contract_id)
+        if contract is None:
+            raise exc.ContractNotFound(f'Договор №{contract_id} не найден. Добавление отменено.')
 
         if contract.status != ContractStatus.ACTIVE:
             raise exc.ContractIsNotActive('Договор должен быть в статусе Подтвержден. Добавление отменено.')
@@ -138,6 +221,9 @@ class Model:
             active_contract = active_contracts_in_project[0]
             raise exc.ActiveContractAlreadyExistsInProject(f'В проекте уже есть активный договор №{active_contract.id}. Добавление отменено.')
 
-        project.contracts.extend([contract])
+        # project version guards the "one active contract per project" check
+        self._swap((Project, project_id, project.version, {}),
+                   (Contract, contract_id, contract.version, {'project_id': project_id}),
+                   )
 
 
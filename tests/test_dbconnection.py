@@ -0,0 +1,148 @@
+import gc
+import sqlite3
+import subprocess
+import sys
+import textwrap
+import time
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+import exceptions as exc
+from dbconnection import InMemoryDBConnection
+from model import Model, Contract
+
+SRC_DIR = Path(__file__).resolve().parent.parent / 'src'
+
+
+def count_contracts(db_path) -> int:
+    connection = sqlite3.connect(db_path)
+    try:
+        return connection.execute('SELECT COUNT(*) FROM contracts').fetchone()[0]
+    finally:
+        connection.close()
+
+
+def run_and_crash(db_path, script: str):
+    # the child process is killed with os._exit: no disconnect, no final snapshot
+    code = textwrap.dedent(f'''
+        import os, sys, time
+        from datetime import date
+        sys.path.insert(0, {str(SRC_DIR)!r})
+        from dbconnection import DBQuery, InMemoryDBConnection
+        from model import Model, Contract
+        db_path = {str(db_path)!r}
+    ''') + textwrap.dedent(script) + '\nos._exit(1)\n'
+
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    assert result.returncode == 1, result.stderr
+
+
+def test_in_memory_snapshot_on_disconnect(tmp_path):
+    db_path = tmp_path / 'data.db'
+
+    model = Model(InMemoryDBConnection(str(db_path), snapshot_interval=0))
+    for i in range(3):
+        model.create_contract(Contract(f'Договор {i}', date.today()))
+
+    # nothing is written before snapshot
+    assert not db_path.exists()
+    model.dbc.disconnect()
+    assert count_contracts(db_path) == 3
+
+    # loaded back at startup
+    model = Model(InMemoryDBConnection(str(db_path), snapshot_interval=0))
+    assert len(model.read_contracts()) == 3
+    model.dbc.disconnect()
+
+
+def test_in_memory_crash_loses_only_data_after_snapshot(tmp_path):
+    db_path = tmp_path / 'data.db'
+
+    run_and_crash(db_path, '''
+        model = Model(InMemoryDBConnection(db_path, snapshot_interval=0))
+        for i in range(5):
+            model.create_contract(Contract(f'Договор {i}', date.today()))
+        model.dbc.snapshot()
+        for i in range(5, 8):
+            model.create_contract(Contract(f'Договор {i}', date.today()))
+    ''')
+
+    assert count_contracts(db_path) == 5
+
+
+def test_in_memory_crash_loss_bounded_by_interval(tmp_path):
+    db_path = tmp_path / 'data.db'
+    interval = 0.2
+
+    # the crash lands half an interval after the last tick
+    run_and_crash(db_path, f'''
+        model = Model(InMemoryDBConnection(db_path, snapshot_interval={interval}))
+        for i in range(5):
+            model.create_contract(Contract(f'Договор {{i}}', date.today()))
+        time.sleep({interval} * 2.5)
+        for i in range(5, 8):
+            model.create_contract(Contract(f'Договор {{i}}', date.today()))
+    ''')
+
+    # rows committed before the sleep survive, rows committed after the last tick are lost
+    assert 5 <= count_contracts(db_path) < 8
+
+
+def test_in_memory_periodic_snapshot(tmp_path):
+    db_path = tmp_path / 'data.db'
+
+    dbc = InMemoryDBConnection(str(db_path), snapshot_interval=0.05)
+    model = Model(dbc)
+    model.create_contract(Contract('Договор', date.today()))
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        if db_path.exists() and count_contracts(db_path) == 1:
+            break
+        time.sleep(0.05)
+
+    assert count_contracts(db_path) == 1
+    dbc.disconnect()
+
+
+def test_in_memory_disconnect_is_final(tmp_path):
+    db_path = tmp_path / 'data.db'
+
+    dbc = InMemoryDBConnection(str(db_path), snapshot_interval=0)
+    model = Model(dbc)
+    model.create_contract(Contract('Договор', date.today()))
+    dbc.disconnect()
+
+    # external change after shutdown must not be overwritten by the collected connection
+    connection = sqlite3.connect(db_path)
+    connection.execute('DELETE FROM contracts')
+    connection.commit()
+    connection.close()
+
+    dbc.disconnect()
+    del model, dbc
+    gc.collect()
+
+    assert count_contracts(db_path) == 0
+
+
+def test_in_memory_snapshot_refused_in_transaction(tmp_path):
+    db_path = tmp_path / 'data.db'
+
+    dbc = InMemoryDBConnection(str(db_path), snapshot_interval=0)
+    model = Model(dbc)
+    dbc.snapshot()
+
+    dbc.session.add(Contract('Договор', date.today()))
+    dbc.session.flush()
+    with pytest.raises(exc.SnapshotInTransaction):
+        dbc.snapshot()
+
+    # the file keeps the last snapshot, the commit makes the next one succeed
+    assert count_contracts(db_path) == 0
+    dbc.session.commit()
+    dbc.snapshot()
+    assert count_contracts(db_path) == 1
+    dbc.disconnect()
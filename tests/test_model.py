@@ -0,0 +1,102 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+import exceptions as exc
+from dbconnection import DBConnection
+from model import Model, RetryPolicy, Contract, ContractStatus, Project
+
+
+def make_models(db_path, retry_policy=None):
+    # two independent sessions on one database, like two parallel workers
+    db = f'sqlite:///{db_path}'
+    return Model(DBConnection(db)), Model(DBConnection(db), retry_policy)
+
+
+def test_stale_status_transition_conflicts(tmp_path):
+    first, second = make_models(tmp_path / 'data.db')
+    first.create_contract(Contract('Договор', date.today()))
+    contract_id = first.read_contracts()[0].id
+
+    # second caches version 1, first moves the contract to version 2
+    stale = second.read_contract_by_id(contract_id)
+    assert stale.version == 1
+    first.confirm_contract(contract_id, date_signed=date.today())
+
+    with pytest.raises(exc.VersionConflict):
+        second.close_contract(contract_id)
+
+    # rollback on conflict refreshes the session, the next attempt succeeds
+    second.close_contract(contract_id)
+    assert stale.status == ContractStatus.CLOSED
+    assert stale.version == 3
+
+
+def test_stale_status_transition_retried(tmp_path):
+    first, second = make_models(tmp_path / 'data.db', RetryPolicy(attempts=2, delay=0))
+    first.create_contract(Contract('Договор', date.today()))
+    contract_id = first.read_contracts()[0].id
+
+    stale = second.read_contract_by_id(contract_id)
+    first.confirm_contract(contract_id, date_signed=date.today())
+    second.close_contract(contract_id)
+
+    assert stale.status == ContractStatus.CLOSED
+
+
+def test_parallel_add_keeps_one_active_contract_in_project(tmp_path):
+    first, second = make_models(tmp_path / 'data.db', RetryPolicy(attempts=2, delay=0))
+    first.create_project(Project('Проект', date.today()))
+    first.create_contract(Contract('Договор 1', date.today()))
+    first.create_contract(Contract('Договор 2', date.today()))
+    project_id = first.read_projects()[0].id
+    contract_ids = [c.id for c in first.read_contracts()]
+    for contract_id in contract_ids:
+        first.confirm_contract(contract_id, date_signed=date.today())
+
+    # both see a project without active contracts
+    stale = second.read_project_by_id(project_id)
+    assert stale.contracts == []
+    first.add_contract_to_project(project_id, contract_ids[0])
+
+    # version conflict -> retry re-reads the project and the usual check fires
+    with pytest.raises(exc.ActiveContractAlreadyExistsInProject):
+        second.add_contract_to_project(project_id, contract_ids[1])
+
+    assert len(first.get_active_contracts(project_id=project_id)) == 1
+
+
+def test_missing_rows_raise_not_found(tmp_path):
+    model, _ = make_models(tmp_path / 'data.db')
+    model.create_project(Project('Проект', date.today()))
+    model.create_contract(Contract('Договор', date.today()))
+    project_id = model.read_projects()[0].id
+    contract_id = model.read_contracts()[0].id
+
+    with pytest.raises(exc.ContractNotFound):
+        model.confirm_contract(999, date_signed=date.today())
+    with pytest.raises(exc.ContractNotFound):
+        model.close_contract(999)
+    with pytest.raises(exc.ContractNotFound):
+        model.add_contract_to_project(project_id, 999)
+    with pytest.raises(exc.ProjectNotFound):
+        model.add_contract_to_project(999, contract_id)
+
+
+def test_retry_policy_needs_an_attempt():
+    with pytest.raises(ValueError):
+        RetryPolicy(attempts=0)
+
+
+def test_version_column_added_to_existing_table(tmp_path):
+    db_path = tmp_path / 'data.db'
+    connection = sqlite3.connect(db_path)
+    connection.execute('CREATE TABLE contracts (id INTEGER PRIMARY KEY, name VARCHAR, date_created DATETIME, '
+                       'date_signed DATETIME, status INTEGER, project_id INTEGER)')
+    connection.execute("INSERT INTO contracts (name, status) VALUES ('Договор', 1)")
+    connection.commit()
+    connection.close()
+
+    model = Model(DBConnection(f'sqlite:///{db_path}'))
+    assert model.read_contracts()[0].version == 1
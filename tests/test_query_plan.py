@@ -0,0 +1,100 @@
+import re
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from dbconnection import DBConnection
+from model import Model, Contract, Project
+
+# any SCAN reads every row, also "SCAN t USING [COVERING] INDEX ..."; index lookups are "SEARCH"
+FULL_SCAN = re.compile(r'^SCAN ')
+
+
+class QueryPlans:
+    """Captures EXPLAIN QUERY PLAN of every SELECT/UPDATE/DELETE run on the engine."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.plans = []
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+            return
+        rows = conn.connection.driver_connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+        self.plans.append((statement, [row[-1] for row in rows]))
+
+    @contextmanager
+    def capture(self):
+        self.plans.clear()
+        event.listen(self.engine, 'before_cursor_execute', self.before_cursor_execute)
+        try:
+            yield self
+        finally:
+            event.remove(self.engine, 'before_cursor_execute', self.before_cursor_execute)
+
+    def full_scans(self):
+        return [(statement, plan) for statement, plan in self.plans
+                if any(FULL_SCAN.match(detail) for detail in plan)]
+
+
+@pytest.fixture
+def model(tmp_path):
+    model = Model(DBConnection(f'sqlite:///{tmp_path / "data.db"}'))
+
+    for i in range(10):
+        model.create_contract(Contract(f'Договор {i}', date.today()))
+    model.create_project(Project('Проект', date.today()))
+    for contract in model.read_contracts()[:3]:
+        model.confirm_contract(contract.id, date_signed=date.today())
+
+    # start every operation with an empty identity map, so reads reach the database
+    model.dbc.session.expunge_all()
+    yield model
+    model.dbc.disconnect()
+
+
+def contract_id(model):
+    return model.read_contracts()[0].id
+
+
+def project_id(model):
+    return model.read_projects()[0].id
+
+
+# operation name -> callable(model, contract_id, project_id); plain inserts have no query plan
+OPERATIONS = {
+    'read_contract_by_id': lambda m, c, p: m.read_contract_by_id(c),
+    'update_contract': lambda m, c, p: m.update_contract(c, name='Договор'),
+    'confirm_contract': lambda m, c, p: m.confirm_contract(c, date_signed=date.today()),
+    'close_contract': lambda m, c, p: m.close_contract(c),
+    'get_active_contracts': lambda m, c, p: m.get_active_contracts(),
+    'get_active_contracts_in_project': lambda m, c, p: m.get_active_contracts(project_id=p),
+    'read_project_by_id': lambda m, c, p: m.read_project_by_id(p),
+    'create_new_project': lambda m, c, p: m.create_new_project(Project('Проект', date.today())),
+    'add_contract_to_project': lambda m, c, p: m.add_contract_to_project(p, c),
+}
+
+
+@pytest.mark.parametrize('operation', OPERATIONS)
+def test_operation_uses_indexes(model, operation):
+    ids = contract_id(model), project_id(model)
+    model.dbc.session.expunge_all()
+
+    plans = QueryPlans(model.dbc.engine)
+    with plans.capture():
+        OPERATIONS[operation](model, *ids)
+
+    assert plans.plans, f'{operation} ran no queries'
+    assert plans.full_scans() == []
+
+
+@pytest.mark.parametrize('operation', ['read_contracts', 'read_projects'])
+def test_listing_is_the_only_full_scan(model, operation):
+    # unfiltered listings read the whole table by design; keep the harness honest about it
+    plans = QueryPlans(model.dbc.engine)
+    with plans.capture():
+        getattr(model, operation)()
+
+    assert len(plans.full_scans()) == 1